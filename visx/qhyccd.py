@@ -1,9 +1,12 @@
 #!/bin/python3
 # Descended from code in https://github.com/JiangXL/qhyccd-python (GPLv3)
 # authored by H.F <moyuejian@outlook.com>
+import atexit
 import ctypes
 import numpy as np
 import logging
+import time
+from collections import namedtuple
 from .libqhy import *
 
 log = logging.getLogger(__name__)
@@ -11,6 +14,45 @@ log = logging.getLogger(__name__)
 TYPE_CHAR20 = ctypes.c_char * 20
 TYPE_CHAR32 = ctypes.c_char * 32
 
+# Control IDs used on the polling paths, bound once at import
+_CTRL_GAIN = CONTROL_ID.CONTROL_GAIN
+_CTRL_EXP = CONTROL_ID.CONTROL_EXPOSURE
+_CTRL_USB = CONTROL_ID.CONTROL_USBTRAFFIC
+_CTRL_BITS = CONTROL_ID.CONTROL_TRANSFERBIT
+_CTRL_COOL = CONTROL_ID.CONTROL_COOLER
+_CTRL_CURTEMP = CONTROL_ID.CONTROL_CURTEMP
+# Slack for clock granularity when judging an exposure complete
+_EXPOSURE_DONE_EPS_SEC = 1e-3
+
+ChipInfo = namedtuple('ChipInfo', 'chip_width chip_height width height pixel_width pixel_height channels bpp')
+
+QHYCCD_HANDLE = ctypes.c_void_p
+_P_DOUBLE = ctypes.POINTER(ctypes.c_double)
+_P_UINT32 = ctypes.POINTER(ctypes.c_uint32)
+
+# Function prototypes from qhyccd.h as (restype, argtypes). Declaring them once
+# lets ctypes convert plain Python ints and floats directly, so callers do not
+# have to box every argument in a ctypes instance.
+SDK_PROTOTYPES = {
+    'InitQHYCCDResource' : (ctypes.c_uint32, []),
+    'ReleaseQHYCCDResource' : (ctypes.c_uint32, []),
+    'ScanQHYCCD' : (ctypes.c_uint32, []),
+    'GetQHYCCDId' : (ctypes.c_uint32, [ctypes.c_uint32, ctypes.c_char_p]),
+    'GetQHYCCDSDKVersion' : (ctypes.c_uint32, [_P_UINT32, _P_UINT32, _P_UINT32, _P_UINT32]),
+    'OpenQHYCCD' : (QHYCCD_HANDLE, [ctypes.c_char_p]),
+    'InitQHYCCD' : (ctypes.c_uint32, [QHYCCD_HANDLE]),
+    'CloseQHYCCD' : (ctypes.c_uint32, [QHYCCD_HANDLE]),
+    'SetQHYCCDParam' : (ctypes.c_uint32, [QHYCCD_HANDLE, ctypes.c_int, ctypes.c_double]),
+    'GetQHYCCDParam' : (ctypes.c_double, [QHYCCD_HANDLE, ctypes.c_int]),
+    'GetQHYCCDParamMinMaxStep' : (ctypes.c_uint32, [QHYCCD_HANDLE, ctypes.c_int, _P_DOUBLE, _P_DOUBLE, _P_DOUBLE]),
+    'GetQHYCCDChipInfo' : (ctypes.c_uint32, [QHYCCD_HANDLE, _P_DOUBLE, _P_DOUBLE, _P_UINT32, _P_UINT32, _P_DOUBLE, _P_DOUBLE, _P_UINT32]),
+    'SetQHYCCDResolution' : (ctypes.c_uint32, [QHYCCD_HANDLE, ctypes.c_uint32, ctypes.c_uint32, ctypes.c_uint32, ctypes.c_uint32]),
+    'SetQHYCCDReadMode' : (ctypes.c_uint32, [QHYCCD_HANDLE, ctypes.c_uint32]),
+    'ExpQHYCCDSingleFrame' : (ctypes.c_uint32, [QHYCCD_HANDLE]),
+    'GetQHYCCDExposureRemaining' : (ctypes.c_uint32, [QHYCCD_HANDLE]),
+    'GetQHYCCDSingleFrame' : (ctypes.c_uint32, [QHYCCD_HANDLE, _P_UINT32, _P_UINT32, _P_UINT32, _P_UINT32, ctypes.c_void_p]),
+}
+
 class QHYCCDSDK():
     '''Class interface for the QHYCCD SDK
     '''
@@ -19,9 +61,10 @@ class QHYCCDSDK():
         '''
         # create sdk handle
         self._sdk = ctypes.CDLL(dll_path)
-
-        self._sdk.GetQHYCCDParam.restype = ctypes.c_double
-        self._sdk.OpenQHYCCD.restype = ctypes.POINTER(ctypes.c_uint32)
+        for name, (restype, argtypes) in SDK_PROTOTYPES.items():
+            function = getattr(self._sdk, name)
+            function.restype = restype
+            function.argtypes = argtypes
         
         ret = self._sdk.InitQHYCCDResource()
 
@@ -29,21 +72,32 @@ class QHYCCDSDK():
         self._ids = []
         for i in range(self._number_of_cameras):
             self._ids.append( TYPE_CHAR32() )
-            self._sdk.GetQHYCCDId(ctypes.c_int(i), self._ids[-1])
+            self._sdk.GetQHYCCDId(i, self._ids[-1])
             log.debug("Cameras {:d} ID {:s}".format(i, self._ids[-1].value.decode('utf8')))
         
         self._camera_handles = {}
+        self._closed = False
+        # Safety net for callers that never close explicitly
+        atexit.register(self.close)
         
-    def __del__(self):
-        '''
+    def close(self):
+        '''Close all open cameras and release the SDK resources
         '''
+        if self._closed:
+            return
         # Go through all camera handles and close the ones that are open
-        for cam_handle in self._camera_handles:
-            try:
-                self._sdk.CloseQHYCCD(cam_handle)
-            except Exception:
-                pass
+        for cam_handle in self._camera_handles.values():
+            self._sdk.CloseQHYCCD(cam_handle)
+        self._camera_handles.clear()
         self._sdk.ReleaseQHYCCDResource()
+        self._closed = True
+        atexit.unregister(self.close)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
     def list_cameras(self) -> list:
         '''
@@ -76,17 +130,17 @@ class QHYCCDSDK():
     #    GetQHYCCDModel(TYPE_CHAR20)
         
     def get_parameter_limits(self, camera_handle, parameter):
-        param_min = ctypes.c_double
-        param_max = ctypes.c_double
-        param_step = ctypes.c_double
+        param_min = ctypes.c_double()
+        param_max = ctypes.c_double()
+        param_step = ctypes.c_double()
         
         self._sdk.GetQHYCCDParamMinMaxStep(camera_handle, parameter, ctypes.byref(param_min), ctypes.byref(param_max), ctypes.byref(param_step))
         
         return param_min.value, param_max.value, param_step.value
     
     def get_all_limits(self, camera_handle):
-        min_gain, max_gain, step_gain = self.get_parameter_limits(camera_handle, CONTROL_ID.CONTROL_GAIN)
-        min_exp, max_exp, step_exp = self.get_parameter_limits(camera_handle, CONTROL_ID.CONTROL_EXPOSURE)
+        min_gain, max_gain, step_gain = self.get_parameter_limits(camera_handle, _CTRL_GAIN)
+        min_exp, max_exp, step_exp = self.get_parameter_limits(camera_handle, _CTRL_EXP)
         
         parameter_limits = {
             'exp' : [min_exp, max_exp, step_exp],
@@ -99,24 +153,16 @@ class QHYCCDSDK():
         # Get Camera Parameters
         chip_width = ctypes.c_double()
         chip_height = ctypes.c_double()
-        width = ctypes.c_uint()
-        height = ctypes.c_uint()
+        width = ctypes.c_uint32()
+        height = ctypes.c_uint32()
         pixel_width = ctypes.c_double()
         pixel_height = ctypes.c_double() 
         channels = ctypes.c_uint32(1)
-        bpp = ctypes.c_uint()
+        bpp = ctypes.c_uint32()
         
         self._sdk.GetQHYCCDChipInfo(camera_handle, ctypes.byref(chip_width), ctypes.byref(chip_height), ctypes.byref(width), ctypes.byref(height), ctypes.byref(pixel_width), ctypes.byref(pixel_height), ctypes.byref(bpp))
         
-        chip_info = {
-            'physical' : [chip_width.value, chip_height.value],
-            'size' : [width.value, height.value],
-            'pixel_size' : [pixel_width.value, pixel_height.value],
-            'channels' : channels.value,
-            'bpp' : bpp.value
-        }
-        
-        return chip_info
+        return ChipInfo(chip_width.value, chip_height.value, width.value, height.value, pixel_width.value, pixel_height.value, channels.value, bpp.value)
         
     
     @property
@@ -153,38 +199,43 @@ class QHYCCDCamera():
         self.bpp = new_bpp
         self.exposure_time = 0.1
         self.gain = 1.0
+        self._exposure_start_ts = 0.0
                 
-        # Get Camera Parameters
+        # Get Camera Parameters; the chip geometry is static so query it once
         self._chip_info = self._sdk.get_chip_info(self._camera)
-        self._width = self._chip_info['size'][0]
-        self._height = self._chip_info['size'][1]
-        self._channels = ctypes.c_uint32(self._chip_info['channels'])
+        self._width = self._chip_info.width
+        self._height = self._chip_info.height
+        self._channels = ctypes.c_uint32(self._chip_info.channels)
+        self._readout_bpp = ctypes.c_uint32()
         
         # Always cool to ten at startup.
         self.target_temperature = 10.0
         
+        # One full-chip image buffer; ROIs are views into it
+        self._max_buffer = np.zeros(self._width * self._height, dtype=np.uint16)
+        
         # Set ROI and readout parameters
-        self._roi_w, self._roi_h = ctypes.c_uint(self._width), ctypes.c_uint(self._height)
+        self._roi_w, self._roi_h = ctypes.c_uint32(self._width), ctypes.c_uint32(self._height)
         self.set_roi(0, 0, self._width, self._height)
-        self._sdk.set_parameter(self._camera, CONTROL_ID.CONTROL_USBTRAFFIC, ctypes.c_double(50))
-        self._sdk.set_parameter(self._camera, CONTROL_ID.CONTROL_TRANSFERBIT, self._bpp)
+        self._sdk.set_parameter(self._camera, _CTRL_USB, 50)
+        self._sdk.set_parameter(self._camera, _CTRL_BITS, self._bpp)
 
     def cancel_exposure(self):
         pass
         
     @property
     def temperature(self):
-        self._temperature = self._sdk.get_parameter(self._camera, CONTROL_ID.CONTROL_CURTEMP)
+        self._temperature = self._sdk.get_parameter(self._camera, _CTRL_CURTEMP)
         return self._temperature
     
     @property
     def target_temperature(self):
-        return self._sdk.get_parameter(self._camera, CONTROL_ID.CONTROL_COOLER)
+        return self._sdk.get_parameter(self._camera, _CTRL_COOL)
         
     @target_temperature.setter
     def target_temperature(self, new_temperature):
         self._target_temperature = new_temperature
-        self._sdk.set_parameter(self._camera, CONTROL_ID.CONTROL_COOLER, ctypes.c_double(self._target_temperature))
+        self._sdk.set_parameter(self._camera, _CTRL_COOL, self._target_temperature)
     
     @property
     def exposure_time(self):
@@ -195,8 +246,8 @@ class QHYCCDCamera():
         # QHYCCD SDK uses microseconds as unit
         # The QHYCCD VIS-X interface uses seconds as the unit. Carefull with converting units!
         self._exposure_time = new_exposure_time
-        self._sdk.set_parameter(self._camera, CONTROL_ID.CONTROL_EXPOSURE, ctypes.c_double(self._exposure_time * 1e6))
-        print("Set exposure time to", self._sdk.get_parameter(self._camera, CONTROL_ID.CONTROL_EXPOSURE) / 1e6)
+        self._sdk.set_parameter(self._camera, _CTRL_EXP, self._exposure_time * 1e6)
+        print("Set exposure time to", self._sdk.get_parameter(self._camera, _CTRL_EXP) / 1e6)
     
     @property
     def gain(self):
@@ -205,59 +256,96 @@ class QHYCCDCamera():
     @gain.setter
     def gain(self, new_gain):
         self._gain = new_gain
-        self._sdk.set_parameter(self._camera, CONTROL_ID.CONTROL_GAIN, ctypes.c_double(self._gain))
+        self._sdk.set_parameter(self._camera, _CTRL_GAIN, self._gain)
     
     #""" Set camera depth """
     @property
     def bpp(self):
-        return self._bpp.value
+        return self._bpp
     
     @bpp.setter
     def bpp(self, new_bpp):
-        self._bpp = ctypes.c_double(new_bpp)
-        self._sdk.set_parameter(self._camera, CONTROL_ID.CONTROL_TRANSFERBIT, self._bpp)
+        self._bpp = new_bpp
+        self._sdk.set_parameter(self._camera, _CTRL_BITS, self._bpp)
+
+    @property
+    def chip_info(self):
+        return self._chip_info
+    
+    @property
+    def frame_shape(self):
+        return self._roi_h.value, self._roi_w.value
 
     #""" Set camera ROI """
     def set_roi(self, x0, y0, roi_w, roi_h):
-        self._roi_w = ctypes.c_uint(roi_w)
-        self._roi_h = ctypes.c_uint(roi_h)
-        # update the image buffer
-        if self._bpp.value == 16:
-            self._imgdata = (ctypes.c_uint16 * roi_w * roi_h)()
-            self._sdk._sdk.SetQHYCCDResolution(self._camera, ctypes.c_uint(x0), ctypes.c_uint(y0), self._roi_w, self._roi_h)
-        else: # 8 bit
-            self._imgdata = (ctypes.c_uint8 * roi_w * roi_h)()
-            self._sdk._sdk.SetQHYCCDResolution(self._camera, ctypes.c_uint(x0), ctypes.c_uint(y0), self._roi_w, self._roi_h)
+        self._roi_w = ctypes.c_uint32(roi_w)
+        self._roi_h = ctypes.c_uint32(roi_h)
+        # update the image buffer; 16 bit is the production mode
+        buffer = self._max_buffer if self._bpp == 16 else self._max_buffer.view(np.uint8)
+        self._imgdata = buffer[:roi_w * roi_h].reshape(roi_h, roi_w)
+        self._sdk._sdk.SetQHYCCDResolution(self._camera, x0, y0, roi_w, roi_h)
+        # The SDK fills the view in place, so the pointer and out-parameters
+        # only change with the ROI.
+        self._imgdata_ptr = self._imgdata.ctypes.data
+        self._readout_params = (ctypes.byref(self._roi_w), ctypes.byref(self._roi_h), ctypes.byref(self._readout_bpp), ctypes.byref(self._channels))
 
     def start_exposure(self):
+        self._exposure_start_ts = time.monotonic()
         ret = self._sdk._sdk.ExpQHYCCDSingleFrame(self._camera)
         
     def remaining_time(self):
+        '''Seconds left in the exposure according to the camera, or None
+        when the SDK reports an error or an out-of-range completion
+        '''
         percentage_complete = self._sdk._sdk.GetQHYCCDExposureRemaining(self._camera) # This counts the completion rate in percentages
+        if percentage_complete > 100:  # includes QHYCCD_ERROR
+            return None
         remaining = (100.0 - percentage_complete)/100.0 * self.exposure_time
         return remaining
     
     def is_exposure_finished(self):
-        if self.remaining_time < 1.0:
-            return True
-        else:
-            return False
+        # Judged from the local clock so polling does not cost an SDK call;
+        # remaining_time() asks the camera when its view is needed.
+        elapsed = time.monotonic() - self._exposure_start_ts
+        return elapsed >= self._exposure_time - _EXPOSURE_DONE_EPS_SEC
     
     def readout(self):
-        ret = self._sdk._sdk.GetQHYCCDSingleFrame(self._camera, ctypes.byref(self._roi_w), ctypes.byref(self._roi_h), ctypes.byref(self._bpp), ctypes.byref(self._channels), self._imgdata)
-        return np.asarray(self._imgdata)
+        '''Read the current frame into the camera's own buffer
+
+        Returns a view of that buffer, not a copy: the next readout or ROI
+        change overwrites it. Copy the result, or use readout_into with a
+        buffer you own, if the frame has to outlive the next readout.
+        '''
+        ret = self._sdk._sdk.GetQHYCCDSingleFrame(self._camera, *self._readout_params, self._imgdata_ptr)
+        return self._imgdata
+    
+    def readout_into(self, out):
+        '''Read the current frame directly into the caller-owned array `out`
+
+        `out` must be a writeable, C-contiguous array with the ROI shape and
+        the dtype of the current bit depth. The SDK writes into its memory
+        directly, so anything else would be overrun.
+        '''
+        if out.shape != self._imgdata.shape or out.dtype != self._imgdata.dtype:
+            raise ValueError("Readout buffer must be {} {}, got {} {}".format(self._imgdata.shape, self._imgdata.dtype, out.shape, out.dtype))
+        if not (out.flags.c_contiguous and out.flags.writeable):
+            raise ValueError("Readout buffer must be writeable and C-contiguous")
+        # ctypes releases the GIL for the duration of the SDK call, so the
+        # blocking transfer does not stall other Python threads.
+        ret = self._sdk._sdk.GetQHYCCDSingleFrame(self._camera, *self._readout_params, out.ctypes.data)
+        return out
     
     def get_singleframe(self):
         ret = self._sdk._sdk.ExpQHYCCDSingleFrame(self._camera)
-        ret = self._sdk._sdk.GetQHYCCDSingleFrame(self._camera, ctypes.byref(self._roi_w), ctypes.byref(self._roi_h), ctypes.byref(self._bpp), ctypes.byref(self._channels), self._imgdata)
-        return np.asarray(self._imgdata)
+        ret = self._sdk._sdk.GetQHYCCDSingleFrame(self._camera, *self._readout_params, self._imgdata_ptr)
+        return self._imgdata
 
     @property
     def read_mode(self):
         return self._read_mode
     
     @read_mode.setter
-    def set_readout_modes(self, new_read_mode):
+    def read_mode(self, new_read_mode):
         if new_read_mode == 0 or new_read_mode == 1:
             self._read_mode = new_read_mode
-            self._sdk.sdk.SetQHYCCDReadMode(self._camera, ctypes.c_uint32(self._read_mode))
\ No newline at end of file
+            self._sdk._sdk.SetQHYCCDReadMode(self._camera, self._read_mode)
\ No newline at end of file
@@ -1,15 +1,19 @@
 import numpy as np
 import warnings
 from typing import Optional
-import datetime
 from astropy.io import fits
 import os
+import errno
 from purepyindi2 import device, properties, constants
 from purepyindi2.messages import DefNumber, DefSwitch, DefText, DefLight
 import ImageStreamIOWrap as ISIO
 import logging
 import time
 import sys
+import queue
+import threading
+import atexit
+import functools
 
 from .qhyccd import QHYCCDSDK, QHYCCDCamera
 
@@ -24,30 +28,140 @@ EXTERNAL_RECORDED_PROPERTIES = {
     'tcsi.teldata.pa': 'PARANG',
     'flipacq.position.in': None,
 }
+# (INDI property, FITS keyword) pairs, with default keywords derived once
+_EXTERNAL_KW_MAP = tuple(
+    (prop, kw if kw is not None else prop.upper().replace('.', ' '))
+    for prop, kw in EXTERNAL_RECORDED_PROPERTIES.items()
+)
 
 RECORDED_WHEELS = ('fwfpm', 'fwlyot')
+_WHEEL_KWS = tuple((fwname, f"{fwname.upper()} PRESET NAME") for fwname in RECORDED_WHEELS)
 
-CAMERA_CONNECT_RETRY_SEC = 5
+# Every device whose properties end up in the FITS headers
+_ALL_EXTERNAL_DEVICES = frozenset(prop.split('.', 1)[0] for prop in EXTERNAL_RECORDED_PROPERTIES) | frozenset(RECORDED_WHEELS)
+
+# Camera connection retries back off exponentially between these bounds
+CAMERA_CONNECT_BACKOFF_MIN_SEC = 1
+CAMERA_CONNECT_BACKOFF_MAX_SEC = 30
+CONNECTION_POLL_SEC = 0.1
+SDK_POLL_INTERVAL_NS = 1_000_000_000
+CAMERA_POLL_INTERVAL_NS = 1_000_000_000
+# Smallest changes worth re-publishing to INDI clients
+TEMP_EPS_DEG_C = 0.05
+EXPTIME_EPS_SEC = 0.1
+# Repeated exposure requests closer together than this are treated as one
+EXPOSE_DEBOUNCE_NS = 50_000_000
+FRAME_BUFFERS = 2
+
+FITS_BLOCK_BYTES = 2880
+FITS_WRITE_CHUNK_BYTES = 4 * 1024 * 1024
 
 def find_active_filter(client, fwname):
     fwelems = client.get(f"{fwname}.filterName")
     if fwelems is None:
         return
-    for elem in fwelems:
-        if fwelems[elem] == constants.SwitchState.ON:
-            return elem
+    return next((elem for elem in fwelems if fwelems[elem] is constants.SwitchState.ON), None)
+
+def changed_beyond(new, old, eps):
+    if new is None or old is None:
+        return new is not old
+    return abs(new - old) > eps
+
+def iso_utc(ts):
+    '''ISO 8601 UTC string with microseconds for a Unix timestamp
+    '''
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(ts)) + ".{:06d}".format(int(ts * 1e6) % 1_000_000)
+
+@functools.lru_cache(maxsize=None)
+def fits_keyword(key):
+    '''Card keyword for a metadata key, spelling out HIERARCH for keys that
+    don't fit a standard 8 character keyword
+    '''
+    if len(key) > 8 or ' ' in key:
+        return f"HIERARCH {key}"
+    return key
+
+def fits_header(shape):
+    '''Structural keywords for a single-HDU uint16 image of `shape` (rows, columns)
+    '''
+    header = fits.Header()
+    header['SIMPLE'] = True
+    header['BITPIX'] = 16
+    header['NAXIS'] = 2
+    header['NAXIS1'] = shape[1]
+    header['NAXIS2'] = shape[0]
+    header['EXTEND'] = True
+    header['BZERO'] = 32768
+    header['BSCALE'] = 1
+    return header
+
+def write_fits(outpath, header_bytes, data, dir_fd=None):
+    '''Write a uint16 image after an already serialized `fits_header`
+
+    `outpath` is resolved relative to the directory `dir_fd` when given.
+
+    FITS stores unsigned 16 bit data as big-endian int16 with BZERO = 32768.
+    The conversion is done a few MB of rows at a time into a scratch buffer,
+    so no full-frame temporary is created. The file is preallocated at its
+    final size and its pages are dropped from the page cache once on disk.
+    If anything fails part way, the file is removed rather than left at
+    full size with a zero-filled tail.
+    '''
+    rows_per_chunk = max(1, FITS_WRITE_CHUNK_BYTES // data[0].nbytes)
+    scratch = np.empty((rows_per_chunk, data.shape[1]), dtype='>u2')
+    padding = -data.nbytes % FITS_BLOCK_BYTES
+    fd = os.open(outpath, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644, dir_fd=dir_fd)
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            try:
+                os.posix_fallocate(fd, 0, len(header_bytes) + data.nbytes + padding)
+            except OSError as err:
+                # glibc emulates preallocation where the filesystem lacks it,
+                # so only a C library without that fallback gets here, and
+                # the file simply grows as it is written
+                if err.errno not in (errno.EOPNOTSUPP, errno.EINVAL):
+                    raise
+            fh.write(header_bytes)
+            for start in range(0, data.shape[0], rows_per_chunk):
+                rows = data[start:start + rows_per_chunk]
+                chunk = scratch[:len(rows)]
+                # Flipping the top bit applies the BZERO offset, and writing into
+                # a big-endian array swaps bytes in the same pass
+                np.bitwise_xor(rows, 0x8000, out=chunk)
+                chunk.tofile(fh)
+            fh.write(bytes(padding))
+            fh.flush()
+            # Raw frames are not read back by this process, so don't let them
+            # crowd other processes out of the page cache
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except BaseException:
+        os.unlink(outpath, dir_fd=dir_fd)
+        raise
 
 class VisX(device.XDevice):
     # us
     data_directory : str = "/opt/MagAOX/rawimages/camvisx"
     exposure_start_ts : float = 0
+    exposure_start_ns : int = 0
+    exposure_end_ns : int = 0
     should_cancel : bool = False
     currently_exposing : bool = False
     should_begin_exposure : bool = False
     last_image_filename : Optional[str] = None
     shmim : ISIO.Image
     frame : np.ndarray
+    _free_frames : queue.LifoQueue
+    _write_q : queue.Queue
     exposure_start_telem : Optional[dict] = None
+    _data_dir_fd : Optional[int] = None
+    _last_sdk_poll_ns : int = 0
+    _sdk_remaining_ns : int = 0
+    _last_cam_poll_ns : int = 0
+    _last_expose_request_ns : int = 0
+    _connect_backoff_sec : float = CAMERA_CONNECT_BACKOFF_MIN_SEC
+    _next_camera_retry_ts : float = 0
+    _pct_scale : float = 0
     # them
     sdk : QHYCCDSDK = None
     camera : QHYCCDCamera = None
@@ -56,42 +170,86 @@ class VisX(device.XDevice):
     temp_current_deg_c : Optional[float] = None
 
     def handle_exptime(self, existing_property, new_message):
-        if not self.currently_exposing and 'target' in new_message and new_message['target'] != existing_property['current']:
+        if self.camera is None:
+            self.log.warning("Ignoring exposure time change request, no camera connected")
+        elif self.currently_exposing:
+            self.log.debug("Ignoring exposure time change request while currently exposing")
+        elif 'target' not in new_message or new_message['target'] == existing_property['current']:
+            return  # nothing changes, so don't echo the property back
+        else:
+            # Apply it to the camera right away: begin_exposure times the
+            # exposure from exposure_time_sec, and update_from_camera would
+            # otherwise read the old value back
+            self.camera.exposure_time = new_message['target']
             existing_property['current'] = new_message['target']
             existing_property['target'] = new_message['target']
             self.exposure_time_sec = new_message['target']
-            self.log.debug(f"Exposure time changed to {new_message['target']} seconds")
-        if self.currently_exposing:
-            self.log.debug("Ignoring exposure time change request while currently exposing")
+            self.log.debug("Exposure time changed to %s seconds", new_message['target'])
         self.update_property(existing_property)
     
     def handle_expose(self, existing_property, new_message):
+        if self.camera is None:
+            self.log.warning("Ignoring exposure control request, no camera connected")
+            self.update_property(existing_property)
+            return
         if 'request' in new_message and new_message['request'] is constants.SwitchState.ON:
-            self.log.debug("Exposure requested!")
-            self.should_begin_exposure = True
+            now = time.monotonic_ns()
+            if now - self._last_expose_request_ns < EXPOSE_DEBOUNCE_NS:
+                self.log.debug("Ignoring repeated exposure request")
+            else:
+                self.log.debug("Exposure requested!")
+                self.should_begin_exposure = True
+                self._last_expose_request_ns = now
         if 'cancel' in new_message and new_message['cancel'] is constants.SwitchState.ON:
             self.log.debug("Exposure cancellation requested")
             self.should_cancel = True
         self.update_property(existing_property)  # ensure the switch turns back off at the client
 
     def handle_temp_ccd(self, existing_property, new_message):
-        if 'target' in new_message and new_message['target'] != existing_property['current']:
-            existing_property['current'] = new_message['target']
-            existing_property['target'] = new_message['target']
-            self.temp_target_deg_c = new_message['target']
-            self.log.debug(f"CCD temperature setpoint changed to {self.temp_target_deg_c} deg C")
+        if self.camera is None:
+            self.log.warning("Ignoring CCD temperature setpoint request, no camera connected")
+            self.update_property(existing_property)
+            return
+        if 'target' not in new_message or not changed_beyond(new_message['target'], existing_property['target'], TEMP_EPS_DEG_C):
+            return  # nothing changes, so don't echo the property back
+        existing_property['current'] = new_message['target']
+        existing_property['target'] = new_message['target']
+        self.temp_target_deg_c = new_message['target']
+        self.log.debug("CCD temperature setpoint changed to %s deg C", self.temp_target_deg_c)
         self.update_property(existing_property)
 
     def _init_camera(self):
+        # Everything is built in locals and self.camera is assigned last, so
+        # a failure part way never leaves a camera without its buffers
         # Load SDK
-        self.sdk = QHYCCDSDK()
-        if self.sdk.number_of_cameras < 1:
-            del self.sdk
-            return False
-        # Find camera
-        self.camera = QHYCCDCamera(self.sdk, 0)
-        self.exposure_time_sec = self.camera.exposure_time
-        self.temp_target_deg_c = self.camera.target_temperature
+        sdk = QHYCCDSDK()
+        try:
+            if sdk.number_of_cameras < 1:
+                sdk.close()
+                return False
+            # Find camera
+            camera = QHYCCDCamera(sdk, 0)
+            # Readout destinations, allocated once and handed back by the writer
+            # thread, so a frame can be written out while the next one is read
+            free_frames = queue.LifoQueue()
+            for _ in range(FRAME_BUFFERS):
+                free_frames.put(np.zeros(camera.frame_shape, dtype=np.uint16))
+            # Shared memory image for live consumers. ImageStreamIO is column-major,
+            # and the transpose of a C-ordered (rows, columns) frame is a
+            # Fortran-ordered view of the same memory, so frames publish without a copy
+            shmim = ISIO.Image()
+            shmim.create(self.name, np.zeros(camera.frame_shape, dtype=np.uint16).T)
+            exposure_time_sec = camera.exposure_time
+            temp_target_deg_c = camera.target_temperature
+        except BaseException:
+            sdk.close()
+            raise
+        self.sdk = sdk
+        self._free_frames = free_frames
+        self.shmim = shmim
+        self.exposure_time_sec = exposure_time_sec
+        self.temp_target_deg_c = temp_target_deg_c
+        self.camera = camera
         return True
 
     def _init_properties(self):
@@ -149,48 +307,78 @@ class VisX(device.XDevice):
         self.add_property(nv)
 
     def setup(self):
-        os.makedirs(self.data_directory, exist_ok=True)
-        while self.client.status is not constants.ConnectionStatus.CONNECTED:
+        if self.client.status is not constants.ConnectionStatus.CONNECTED:
             self.log.info("Waiting for connection before trying to define properties...")
-            time.sleep(1)
-        self.log.info(f"INDI client connection: {self.client.status}")
-        devices = set()
-        for prop in EXTERNAL_RECORDED_PROPERTIES:
-            device = prop.split('.')[0]
-            devices.add(device)
-        for fw in RECORDED_WHEELS:
-            devices.add(fw)
-        self.client.get_properties(devices)
+        while self.client.status is not constants.ConnectionStatus.CONNECTED:
+            time.sleep(CONNECTION_POLL_SEC)
+        self.log.info("INDI client connection: %s", self.client.status)
+        self.client.get_properties(_ALL_EXTERNAL_DEVICES)
         self.log.info("Performed get_properties")
+        self._write_q = queue.Queue(maxsize=FRAME_BUFFERS)
+        threading.Thread(target=self._writer_loop, daemon=True).start()
+        # Frames handed to the writer have already been reported as saved,
+        # so let them reach the disk before the interpreter exits
+        atexit.register(self._write_q.join)
         
         self._init_properties()
-        success = self._init_camera()
-        while not success:
-            self.log.debug(f"Attempting to find QHYCCD camera...")
-            success = self._init_camera()
-            if not success:
-                self.log.debug(f"Failed, retrying in {CAMERA_CONNECT_RETRY_SEC}")
-                time.sleep(CAMERA_CONNECT_RETRY_SEC)
-        self.properties['fsm']['state'] = 'OPERATING'
-        self.log.debug("Set FSM prop")
-        self.update_property(self.properties['fsm'])
-        self.log.debug("Sent FSM prop")
+        # The camera is found from loop() so the device stays responsive
+        # while it is absent
+        self._set_fsm_state('CONNECTING')
         self.log.debug("Set up complete")
 
+    def _set_fsm_state(self, state):
+        self.properties['fsm']['state'] = state
+        self.update_property(self.properties['fsm'])
+        self.log.debug("FSM state: %s", state)
+
+    def _try_connect_camera(self):
+        self.log.debug("Attempting to find QHYCCD camera...")
+        try:
+            connected = self._init_camera()
+        except Exception:
+            self.log.exception("Error while connecting to the camera")
+            connected = False
+        if connected:
+            self._connect_backoff_sec = CAMERA_CONNECT_BACKOFF_MIN_SEC
+            self._set_fsm_state('OPERATING')
+            return
+        self.log.debug("Failed, retrying in %s", self._connect_backoff_sec)
+        self._next_camera_retry_ts = time.monotonic() + self._connect_backoff_sec
+        self._connect_backoff_sec = min(self._connect_backoff_sec * 2, CAMERA_CONNECT_BACKOFF_MAX_SEC)
+
     def update_from_camera(self):
         if self.camera is None:
             return
+        # Each getter is a USB control transfer, so poll at a human rate
+        now = time.monotonic_ns()
+        if now - self._last_cam_poll_ns < CAMERA_POLL_INTERVAL_NS:
+            return
+        self._last_cam_poll_ns = now
         self.temp_target_deg_c = self.camera.target_temperature
         self.temp_current_deg_c = self.camera.temperature
         self.exposure_time_sec = self.camera.exposure_time
-        self.log.debug(f"Read from camera: target = {self.temp_target_deg_c} deg C, current = {self.temp_current_deg_c} deg C, exptime = {self.exposure_time_sec} s")
+        self.log.debug("Read from camera: target = %s deg C, current = %s deg C, exptime = %s s", self.temp_target_deg_c, self.temp_current_deg_c, self.exposure_time_sec)
 
     def refresh_properties(self):
-        now = time.time()
+        now = time.monotonic_ns()
         current = self.properties['current_exposure']
         if self.currently_exposing:
-            remaining_sec = max((self.exposure_start_ts + self.exposure_time_sec) - now, 0)
-            remaining_pct = 100 * remaining_sec / self.exposure_time_sec
+            if now - self._last_sdk_poll_ns > SDK_POLL_INTERVAL_NS:
+                # Re-sync the local estimate with the camera's own progress,
+                # bounded by the clock that actually ends the exposure. A
+                # failed SDK reading falls back to that clock
+                self._last_sdk_poll_ns = now
+                clock_remaining_ns = max(self.exposure_end_ns - now, 0)
+                sdk_remaining_sec = self.camera.remaining_time()
+                if sdk_remaining_sec is None:
+                    self._sdk_remaining_ns = clock_remaining_ns
+                else:
+                    self._sdk_remaining_ns = min(int(sdk_remaining_sec * 1e9), clock_remaining_ns)
+            remaining_ns = max(self._sdk_remaining_ns - (now - self._last_sdk_poll_ns), 0)
+            # Quantize to the displayed precision so the property is only
+            # re-sent when what clients show would change
+            remaining_sec = round(remaining_ns / 1e9, 1)
+            remaining_pct = int(remaining_sec * self._pct_scale)
         else:
             remaining_sec = 0
             remaining_pct = 0
@@ -201,13 +389,19 @@ class VisX(device.XDevice):
         
         self.update_from_camera()
 
-        self.properties['temp_ccd']['current'] = self.temp_current_deg_c
-        self.properties['temp_ccd']['target'] = self.temp_target_deg_c
-        self.update_property(self.properties['temp_ccd'])
+        temp_ccd = self.properties['temp_ccd']
+        if (changed_beyond(self.temp_current_deg_c, temp_ccd['current'], TEMP_EPS_DEG_C) or
+                changed_beyond(self.temp_target_deg_c, temp_ccd['target'], TEMP_EPS_DEG_C)):
+            temp_ccd['current'] = self.temp_current_deg_c
+            temp_ccd['target'] = self.temp_target_deg_c
+            self.update_property(temp_ccd)
 
-        self.properties['exptime']['current'] = self.exposure_time_sec
-        self.properties['exptime']['target'] = self.exposure_time_sec
-        self.update_property(self.properties['exptime'])
+        exptime = self.properties['exptime']
+        if (changed_beyond(self.exposure_time_sec, exptime['current'], EXPTIME_EPS_SEC) or
+                changed_beyond(self.exposure_time_sec, exptime['target'], EXPTIME_EPS_SEC)):
+            exptime['current'] = self.exposure_time_sec
+            exptime['target'] = self.exposure_time_sec
+            self.update_property(exptime)
 
 
     def maintain_temperature_control(self):
@@ -223,57 +417,86 @@ class VisX(device.XDevice):
             'GAIN': self.camera.gain,
             'EXPTIME': self.camera.exposure_time,
         }
-        for indi_prop in EXTERNAL_RECORDED_PROPERTIES:
-            if EXTERNAL_RECORDED_PROPERTIES[indi_prop] is None:
-                new_kw = indi_prop.upper().replace('.', ' ')
-            else:
-                new_kw = EXTERNAL_RECORDED_PROPERTIES[indi_prop]
+        for indi_prop, new_kw in _EXTERNAL_KW_MAP:
             value = self.client.get(indi_prop)
-            if hasattr(value, 'value'):
-                value = value.value
-            meta[new_kw] = value
-        for fwname in RECORDED_WHEELS:
-            meta[f"{fwname.upper()} PRESET NAME"] = find_active_filter(self.client, fwname)
+            # Switch elements come back as SwitchState enums, unwrap them
+            # whatever the property
+            meta[new_kw] = getattr(value, 'value', value)
+        for fwname, new_kw in _WHEEL_KWS:
+            meta[new_kw] = find_active_filter(self.client, fwname)
         return meta
 
     def begin_exposure(self):
         self.currently_exposing = True
         self.should_begin_exposure = False
+        # Wall clock for the FITS dates, monotonic clock for all timing
         self.exposure_start_ts = time.time()
-        self.exposure_start_telem = self._gather_metadata()
-        self.camera.start_exposure()
+        self.exposure_start_ns = time.monotonic_ns()
+        self.exposure_end_ns = self.exposure_start_ns + int(self.exposure_time_sec * 1e9)
+        self._pct_scale = 100.0 / self.exposure_time_sec if self.exposure_time_sec else 0.0
+        self._last_sdk_poll_ns = self.exposure_start_ns
+        self._sdk_remaining_ns = self.exposure_end_ns - self.exposure_start_ns
         self.log.debug("Asking camera to begin exposure")
+        self.camera.start_exposure()
+        # Telemetry is recorded while the camera integrates, not before
+        self.exposure_start_telem = self._gather_metadata()
+
+    def _writer_loop(self):
+        while True:
+            frame, header_bytes, filename = self._write_q.get()
+            try:
+                if self._data_dir_fd is None:
+                    os.makedirs(self.data_directory, exist_ok=True)
+                    # Files are created relative to this descriptor, so the
+                    # path is resolved once rather than on every write
+                    self._data_dir_fd = os.open(self.data_directory, os.O_DIRECTORY | os.O_CLOEXEC)
+                write_fits(filename, header_bytes, frame, dir_fd=self._data_dir_fd)
+            except Exception:
+                self.log.exception("Unable to save frame!")
+            finally:
+                self._free_frames.put(frame)
+                self._write_q.task_done()
 
     def finalize_exposure(self, actual_exptime_sec=None):
-        img = self.camera.readout()
-        # Create FITS structure
-        hdul = fits.HDUList([
-            fits.PrimaryHDU(img)
-        ])
-        # Populate headers
-        meta = self._gather_metadata()
-        self.log.debug(f"{meta=}")
-        meta['DATE-OBS'] = datetime.datetime.fromtimestamp(self.exposure_start_ts).isoformat()
-        exposure_time = self.camera.exposure_time if actual_exptime_sec is None else actual_exptime_sec
-        meta['DATE-END'] = datetime.datetime.fromtimestamp(self.exposure_start_ts + exposure_time).isoformat()
-        meta['DATE'] = datetime.datetime.utcnow().isoformat()
-        for key in self.exposure_start_telem:
-            meta[f"BEGIN {key}"] = self.exposure_start_telem[key]
-        with warnings.catch_warnings(): 
-            warnings.simplefilter('ignore')
-            hdul[0].header.update(meta)
-        # Note if exposure was canceled
-        if actual_exptime_sec is not None:
-            hdul[0].header['CANCELD'] = True
-        # Write to /data path
-        timestamp = datetime.datetime.utcnow().strftime("%Y-%m-%dT%H%M%S")
-        self.last_image_filename = f"camvisx_{timestamp}.fits"
-        outpath = f"{self.data_directory}/{self.last_image_filename}"
-        self.log.info(f"Saving to {outpath}")
+        # The frame is still on the camera and must be read out, so when every
+        # buffer is queued for writing wait for one rather than drop the frame
         try:
-            hdul.writeto(outpath)
-        except Exception:
-            self.log.exception(f"Unable to save frame!")
+            self.frame = self._free_frames.get_nowait()
+        except queue.Empty:
+            self.log.warning("All frame buffers are waiting to be written, blocking until one is free")
+            self.frame = self._free_frames.get()
+        # The buffer only returns to the pool through the writer, so give it
+        # back here if anything fails before it is queued
+        try:
+            self.camera.readout_into(self.frame)
+            self.shmim.write(self.frame.T)
+            # Populate headers
+            meta = self._gather_metadata()
+            self.log.debug("meta=%r", meta)
+            meta['DATE-OBS'] = iso_utc(self.exposure_start_ts)
+            exposure_time = self.camera.exposure_time if actual_exptime_sec is None else actual_exptime_sec
+            meta['DATE-END'] = iso_utc(self.exposure_start_ts + exposure_time)
+            now = time.time()
+            meta['DATE'] = iso_utc(now)
+            for key in self.exposure_start_telem:
+                meta[f"BEGIN {key}"] = self.exposure_start_telem[key]
+            # Note if exposure was canceled
+            if actual_exptime_sec is not None:
+                meta['CANCELD'] = True
+            header = fits_header(self.frame.shape)
+            with warnings.catch_warnings(): 
+                warnings.simplefilter('ignore')
+                header.extend([fits.Card(fits_keyword(key), value) for key, value in meta.items()])
+                header_bytes = header.tostring().encode('ascii')
+            # Write to /data path
+            timestamp = time.strftime("%Y-%m-%dT%H%M%S", time.gmtime(now))
+            self.last_image_filename = f"camvisx_{timestamp}.fits"
+            self.log.info("Saving to %s/%s", self.data_directory, self.last_image_filename)
+            # Never blocks: each queued item holds one of the FRAME_BUFFERS buffers
+            self._write_q.put((self.frame, header_bytes, self.last_image_filename))
+        except BaseException:
+            self._free_frames.put(self.frame)
+            raise
         self.currently_exposing = False
 
     def cancel_exposure(self):
@@ -282,16 +505,20 @@ class VisX(device.XDevice):
         self.log.debug("Asking camera to cancel exposure")
         # actually cancel
         # TODO
-        actual_exptime_sec = time.time() - self.exposure_start_ts
+        actual_exptime_sec = (time.monotonic_ns() - self.exposure_start_ns) / 1e9
         self.finalize_exposure(actual_exptime_sec=actual_exptime_sec)
 
     def loop(self):
-        now = time.time()
+        now = time.monotonic_ns()
+        if self.camera is None:
+            if time.monotonic() >= self._next_camera_retry_ts:
+                self._try_connect_camera()
+            return
         if self.should_cancel:
             self.cancel_exposure()
         elif not self.currently_exposing and self.should_begin_exposure:
             self.begin_exposure()
-        elif self.currently_exposing and now > (self.exposure_time_sec + self.exposure_start_ts):
+        elif self.currently_exposing and now > self.exposure_end_ns:
             self.currently_exposing = False
             self.log.debug("Exposure finished")
             self.finalize_exposure()